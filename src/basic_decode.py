@@ -1,5 +1,6 @@
 import py_qcode as pq
 import networkx as nx
+import numpy as np
 from qecc import X, Z, I
 
 from time import sleep
@@ -25,27 +26,45 @@ test_code = pq.square_octagon_code(test_lattice, test_dual_lattice)
 test_decoder = pq.mwpm_decoder(test_lattice, test_dual_lattice)
 test_logical_ops = pq.squoct_log_ops(test_lattice.total_size)
 '''
+#Set to False to skip the point-by-point printouts, e.g. when timing 
+#this script; only a summary of each trial is printed then.
+DEBUG_PRINT = True
+
 for idx in range(n_trials):
     
     test_lattice.clear()
     test_dual_lattice.clear()
 
     test_model.act_on(test_lattice)
-    print "Real Errors: \n============"
-    pq.error_print(test_lattice)
+    if DEBUG_PRINT:
+        print "Real Errors: \n============"
+        pq.error_print(test_lattice)
+    else:
+        z_bits, x_bits = test_lattice.pack_errors()
+        print "Real Errors: {0}".format(np.count_nonzero(z_bits | x_bits))
 
     test_code.measure()
-    print "Syndromes: \n=========="
-    pq.syndrome_print(test_dual_lattice)
+    if DEBUG_PRINT:
+        print "Syndromes: \n=========="
+        pq.syndrome_print(test_dual_lattice)
 
     test_decoder.infer()
-    print "Error After Decoding:\n====================="
-    pq.error_print(test_lattice)
+    if DEBUG_PRINT:
+        print "Error After Decoding:\n====================="
+        pq.error_print(test_lattice)
 
-    test_dual_lattice.clear()
-    test_code.measure()
-    print "Syndromes After Decoding:\n========================="
-    pq.syndrome_print(test_dual_lattice)
+    if DEBUG_PRINT:
+        test_dual_lattice.clear()
+        test_code.measure()
+        print "Syndromes After Decoding:\n========================="
+        pq.syndrome_print(test_dual_lattice)
+    else:
+        #Noiseless syndromes, straight from the packed errors:
+        bits = test_lattice.pack_errors()
+        flipped = any([check.anticommutations(bits).any() 
+                        for check in test_code.parity_check_list])
+        print "Syndromes After Decoding: {0}".format(
+                                    "Some" if flipped else "None")
 
     #print "Logical Operators:\n=================="
     #for op in test_logical_ops:
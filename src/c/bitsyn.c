@@ -0,0 +1,47 @@
+#include "bitsyn.h"
+
+void pack_words(const uint8_t *bits, int32_t n_bits, uint64_t *words){
+    /*
+    Packs an array of bits (one per byte) into 64-bit words, so that
+    bit number idx ends up in position (idx % 64) of word (idx / 64).
+    */
+    int32_t idx;
+    int32_t n_words = (n_bits + 63) / 64;
+
+    for (idx = 0; idx < n_words; idx++) words[idx] = 0;
+    for (idx = 0; idx < n_bits; idx++)
+    {
+        words[idx >> 6] |= ((uint64_t) (bits[idx] & 1)) << (idx & 63);
+    }
+}
+
+void syndromes_from_masks(const uint64_t *z_words, const uint64_t *x_words,
+                          const int32_t *indptr, const int32_t *word_idx,
+                          const uint64_t *z_masks, const uint64_t *x_masks,
+                          int32_t n_checks, uint8_t *syndromes){
+    /*
+    Computes the syndrome bit of each check as the parity of the 
+    symplectic inner product between the check and a packed error.
+    Each check is stored as a list of (word, mask) entries in 
+    compressed sparse row form: entries indptr[check] up to 
+    indptr[check + 1]. z_masks select the Z-bits of the error which 
+    anticommute with the check (i.e. where the check has an X 
+    component), and x_masks select the X-bits. A single AND and 
+    POPCNT therefore handles every qubit of a check which lies in the
+    same word.
+    */
+    int32_t check, entry, word;
+    int count;
+
+    for (check = 0; check < n_checks; check++)
+    {
+        count = 0;
+        for (entry = indptr[check]; entry < indptr[check + 1]; entry++)
+        {
+            word = word_idx[entry];
+            count += __builtin_popcountll(z_words[word] & z_masks[entry]);
+            count += __builtin_popcountll(x_words[word] & x_masks[entry]);
+        }
+        syndromes[check] = (uint8_t) (count & 1);
+    }
+}
@@ -0,0 +1,12 @@
+#ifndef bitsyn_h__
+#define bitsyn_h__
+
+#include <stdint.h>
+
+extern void pack_words(const uint8_t *bits, int32_t n_bits, uint64_t *words);
+extern void syndromes_from_masks(const uint64_t *z_words, const uint64_t *x_words,
+                                 const int32_t *indptr, const int32_t *word_idx,
+                                 const uint64_t *z_masks, const uint64_t *x_masks,
+                                 int32_t n_checks, uint8_t *syndromes);
+
+#endif
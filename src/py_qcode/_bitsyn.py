@@ -0,0 +1,87 @@
+"""
+Syndrome extraction on bit-packed errors, using ``libbitsyn.so``
+(built from ``src/c/bitsyn.c`` with ``make bitsyn_library``) through
+ctypes. Errors are packed into 64-bit words, and each check is stored
+as a short list of (word, mask) pairs, so that all of its qubits which
+share a word are handled by a single AND and POPCNT. If the library
+has not been built, ``available`` is ``False`` and callers fall back
+to NumPy.
+"""
+
+from ctypes import c_int32, cdll
+from numpy import array, empty, int32, uint8, uint64
+from numpy.ctypeslib import ndpointer
+import os.path
+
+path_to_lib = os.path.join(os.path.dirname(__file__), 'libbitsyn.so')
+try:
+    libbitsyn = cdll.LoadLibrary(path_to_lib)
+except OSError:
+    libbitsyn = None
+
+available = libbitsyn is not None
+
+if available:
+    _words_ptr = ndpointer(dtype=uint64, flags='C_CONTIGUOUS')
+    _bits_ptr = ndpointer(dtype=uint8, flags='C_CONTIGUOUS')
+    _idx_ptr = ndpointer(dtype=int32, flags='C_CONTIGUOUS')
+
+    libbitsyn.pack_words.restype = None
+    libbitsyn.pack_words.argtypes = [_bits_ptr, c_int32, _words_ptr]
+
+    libbitsyn.syndromes_from_masks.restype = None
+    libbitsyn.syndromes_from_masks.argtypes = [_words_ptr, _words_ptr,
+                                        _idx_ptr, _idx_ptr, _words_ptr,
+                                        _words_ptr, c_int32, _bits_ptr]
+
+def word_masks(support, stab_x, stab_z):
+    """
+    Converts the support of a set of checks (see
+    :meth:`py_qcode.Lattice.support`) and the symplectic form of their
+    common stabilizer into ``(indptr, word_idx, z_masks, x_masks)``,
+    the compressed sparse row form used by :func:`syndromes`.
+    ``z_masks`` pick out the Z-bits of an error which flip the
+    syndrome, which are those where the stabilizer has an X component,
+    and vice versa.
+    """
+    indptr, word_idx, z_masks, x_masks = [0], [], [], []
+    stab_x, stab_z = stab_x.tolist(), stab_z.tolist()
+    for row in support.tolist():
+        row_masks = {}
+        for qubit, z_flip, x_flip in zip(row, stab_x, stab_z):
+            bit = 1 << (qubit & 63)
+            z_mask, x_mask = row_masks.get(qubit >> 6, (0, 0))
+            #A qubit which appears twice in a check cancels out:
+            row_masks[qubit >> 6] = (z_mask ^ bit * z_flip,
+                                        x_mask ^ bit * x_flip)
+        for word in sorted(row_masks):
+            word_idx.append(word)
+            z_masks.append(row_masks[word][0])
+            x_masks.append(row_masks[word][1])
+        indptr.append(len(word_idx))
+
+    return (array(indptr, dtype=int32), array(word_idx, dtype=int32),
+            array(z_masks, dtype=uint64), array(x_masks, dtype=uint64))
+
+def pack_words(bits):
+    """
+    Packs an array of bits into 64-bit words, bit ``idx`` going to
+    position ``idx % 64`` of word ``idx // 64``.
+    """
+    words = empty(((len(bits) + 63) // 64,), dtype=uint64)
+    libbitsyn.pack_words(bits, len(bits), words)
+    return words
+
+def syndromes(z_bits, x_bits, masks):
+    """
+    Returns the syndrome bit of every check described by ``masks``
+    (the output of :func:`word_masks`), for the error with the given
+    Z- and X-bits.
+    """
+    indptr, word_idx, z_masks, x_masks = masks
+    n_checks = len(indptr) - 1
+    out = empty((n_checks,), dtype=uint8)
+    libbitsyn.syndromes_from_masks(pack_words(z_bits), pack_words(x_bits),
+                                    indptr, word_idx, z_masks, x_masks,
+                                    n_checks, out)
+    return out
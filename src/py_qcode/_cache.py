@@ -0,0 +1,80 @@
+"""
+On-disk cache for arrays which depend only on the type and size of a
+lattice, such as the supports of its parity checks (see
+:meth:`py_qcode.Lattice.support`). Arrays are stored as ``.npy`` files
+under ``~/.cache/py_qcode/`` (or the directory named by the
+``PY_QCODE_CACHE`` environment variable), and are loaded as read-only
+memory maps, so that processes running sweeps over the same sizes share
+them. Arrays loaded or built by this process are also kept in memory.
+If the cache can't be written, arrays are simply rebuilt.
+
+Keys should include the :func:`source_digest` of the module which 
+builds the arrays, so that changing how they are built never serves 
+stale files.
+"""
+
+from hashlib import md5
+from numpy import load, save
+import os
+import os.path
+
+#Bump this to invalidate existing files if the layout of any cached
+#array changes:
+_FORMAT_VERSION = 1
+
+cache_dir = os.environ.get('PY_QCODE_CACHE',
+                    os.path.join(os.path.expanduser('~'), '.cache',
+                                    'py_qcode'))
+
+#Arrays already loaded or built by this process, by key:
+_loaded = {}
+
+def source_digest(module_file):
+    """
+    Returns the md5 digest of the source of the module whose 
+    ``__file__`` is ``module_file`` (or of the file itself, if only the
+    compiled module is installed).
+    """
+    source_file = os.path.splitext(module_file)[0] + '.py'
+    if not os.path.isfile(source_file):
+        source_file = module_file
+    with open(source_file, 'rb') as phil:
+        return md5(phil.read()).hexdigest()
+
+def _path(key):
+    digest = md5(repr((_FORMAT_VERSION, key))).hexdigest()
+    return os.path.join(cache_dir, digest + '.npy')
+
+def get_or_build(key, builder):
+    """
+    Returns the array stored under ``key``, which can be any tuple with
+    a stable ``repr``, such as ``('SquareLattice', (8, 8), False,
+    'star')``. If there is no such array, it is built by calling
+    ``builder`` with no arguments and stored.
+    """
+    try:
+        return _loaded[key]
+    except KeyError:
+        pass
+
+    path = _path(key)
+    try:
+        arr = load(path, mmap_mode='r')
+    except (IOError, OSError, ValueError):
+        arr = builder()
+        _save(path, arr)
+    _loaded[key] = arr
+    return arr
+
+def _save(path, arr):
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        #Write to a temporary file first, so that other processes
+        #never load a partial array:
+        tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as phil:
+            save(phil, arr)
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        pass
@@ -0,0 +1,116 @@
+"""
+Compiled kernels for sampling errors and syndromes over many trials at
+once. If numba is available, the sampling loop is compiled and spread
+across trials with ``prange``; otherwise an equivalent NumPy version is
+used. Both take their uniform random numbers from the caller, so that
+results only depend on the generator, not on whether numba is
+installed. Decoding stays in Python, see :meth:`py_qcode.Simulation.run`.
+"""
+
+from numpy import (arange, array, bitwise_xor, concatenate, cumsum,
+                    int32, searchsorted, tile, uint8, zeros)
+from _rng import as_rng
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+#Single-qubit Paulis are encoded as integers 0, 1, 2, 3 for I, X, Y, Z:
+PAULI_CODES = 'IXYZ'
+_X_OF = array([0, 1, 1, 0], dtype=uint8)
+_Z_OF = array([0, 0, 1, 1], dtype=uint8)
+
+def pauli_cum_probs(error_model):
+    """
+    Returns the cumulative probabilities of I, X, Y and Z for an
+    error model whose operators are all Paulis.
+    """
+    probs = zeros(4)
+    for prob, op in error_model.prob_op_list:
+        if op not in PAULI_CODES:
+            raise ValueError("Batched sampling requires a Pauli error "+\
+                "model, received operator {0}.".format(op))
+        probs[PAULI_CODES.index(op)] += prob
+    cum_probs = cumsum(probs)
+    cum_probs[-1] = 1. #guard against rounding
+    return cum_probs
+
+def stack_checks(checks, lattice):
+    """
+    Concatenates the supports of a list of
+    :class:`py_qcode.StabilizerCheck` objects into compressed sparse
+    row form. Returns ``(indptr, indices, reads)``, where the entries
+    of check ``c`` are ``indices[indptr[c]:indptr[c + 1]]``, and each
+    entry of ``reads`` has bit 0 set if the Z-bit of that qubit flips
+    the syndrome, and bit 1 set if the X-bit does.
+    """
+    indptr, indices, reads = [array([0])], [], []
+    for check in checks:
+        if getattr(check, 'primal_lattice', None) is not lattice:
+            raise ValueError("Batched sampling requires stabilizer "+\
+                "checks defined on the simulated lattice.")
+        n_rows, k = check.support.shape
+        indices.append(check.support.ravel())
+        reads.append(tile(check._stab_x | (check._stab_z << 1), n_rows))
+        indptr.append(indptr[-1][-1] + k * arange(1, n_rows + 1))
+
+    return (concatenate(indptr).astype(int32),
+            concatenate(indices).astype(int32), concatenate(reads))
+
+def _sample_trials_numpy(indptr, indices, reads, z_init, x_init,
+                            cum_probs, samples):
+    codes = searchsorted(cum_probs, samples, side='right')
+    z_bits = z_init ^ _Z_OF[codes]
+    x_bits = x_init ^ _X_OF[codes]
+    flips = (z_bits[:, indices] & (reads & 1)) ^ \
+            (x_bits[:, indices] & (reads >> 1))
+    syndromes = bitwise_xor.reduceat(flips, indptr[:-1], axis=1)
+    return z_bits, x_bits, syndromes
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _sample_trials_numba(indptr, indices, reads, z_init, x_init,
+                                cum_probs, samples):
+        n_trials, n_qubits = samples.shape
+        n_checks = indptr.shape[0] - 1
+        z_bits = zeros((n_trials, n_qubits), dtype=uint8)
+        x_bits = zeros((n_trials, n_qubits), dtype=uint8)
+        syndromes = zeros((n_trials, n_checks), dtype=uint8)
+        for trial in prange(n_trials):
+            for qubit in range(n_qubits):
+                sample = samples[trial, qubit]
+                code = 0
+                while code < 3 and sample >= cum_probs[code]:
+                    code += 1
+                z_bits[trial, qubit] = z_init[qubit] ^ _Z_OF[code]
+                x_bits[trial, qubit] = x_init[qubit] ^ _X_OF[code]
+            for check in range(n_checks):
+                syndrome = 0
+                for entry in range(indptr[check], indptr[check + 1]):
+                    qubit = indices[entry]
+                    if reads[entry] & 1:
+                        syndrome ^= z_bits[trial, qubit]
+                    if reads[entry] & 2:
+                        syndrome ^= x_bits[trial, qubit]
+                syndromes[trial, check] = syndrome
+        return z_bits, x_bits, syndromes
+
+def sample_trials(indptr, indices, reads, z_init, x_init, cum_probs,
+                    n_trials, rng=None):
+    """
+    Samples ``n_trials`` independent errors on top of ``z_init`` and
+    ``x_init``, with single-qubit Paulis drawn according to
+    ``cum_probs`` (see :func:`pauli_cum_probs`), and computes their
+    syndromes for the checks described by ``indptr``, ``indices`` and
+    ``reads`` (see :func:`stack_checks`). Returns arrays ``z_bits``,
+    ``x_bits`` of shape ``(n_trials, n_qubits)``, and ``syndromes`` of
+    shape ``(n_trials, n_checks)``. Random numbers are drawn from 
+    ``rng`` (see :mod:`py_qcode._rng`).
+    """
+    samples = as_rng(rng).random((n_trials, len(z_init)))
+    if njit is not None:
+        return _sample_trials_numba(indptr, indices, reads, z_init, 
+                                    x_init, cum_probs, samples)
+    return _sample_trials_numpy(indptr, indices, reads, z_init, x_init,
+                                cum_probs, samples)
@@ -0,0 +1,54 @@
+"""
+Random number generators for error models and syndrome noise. With
+NumPy 1.17 or later, :func:`default_rng` returns a
+:class:`numpy.random.Generator` (using PCG64). On older versions, a
+:class:`numpy.random.RandomState` is wrapped so that it has the
+``random`` method used by py_qcode.
+
+Functions which take an ``rng`` argument accept ``None``, which draws
+from NumPy's global state (so that :func:`numpy.random.seed` still
+applies), an integer seed, or a generator returned by
+:func:`default_rng`.
+"""
+
+import numpy.random as _np_random
+
+try:
+    from numpy.random import Generator
+except ImportError:
+    Generator = None
+
+class RandomStateRNG(object):
+    """
+    Wraps a :class:`numpy.random.RandomState` (or the
+    :mod:`numpy.random` module itself) in the subset of the
+    :class:`numpy.random.Generator` interface used by py_qcode.
+    """
+    def __init__(self, state):
+        self.state = state
+
+    def random(self, size=None):
+        return self.state.random_sample(size)
+
+global_rng = RandomStateRNG(_np_random)
+
+def default_rng(seed=None):
+    """
+    Returns a new generator seeded with ``seed``, or ``seed`` itself if
+    it is already a generator.
+    """
+    if isinstance(seed, RandomStateRNG) or \
+        (Generator is not None and isinstance(seed, Generator)):
+        return seed
+    if Generator is not None:
+        return _np_random.default_rng(seed)
+    return RandomStateRNG(_np_random.RandomState(seed))
+
+def as_rng(rng):
+    """
+    Converts the ``rng`` argument of a py_qcode function into a
+    generator, see above.
+    """
+    if rng is None:
+        return global_rng
+    return default_rng(rng)
@@ -1,7 +1,15 @@
 from qecc import Pauli, commutes_with
-from lattice import _even_evens, _odd_odds, _squoct_affine_map, skew_coords
+from lattice import (_even_evens_array, _odd_odds_array, 
+                        _squoct_square_array, _squoct_x_octagon_array,
+                        _squoct_z_octagon_array, _symplectic_bits, 
+                        _X_BITS, _Z_BITS)
 from types import FunctionType
-from numpy.random import rand
+from string import maketrans
+from itertools import product
+from numpy import (arange, array, bitwise_xor, empty, flatnonzero, int32, 
+                    ndarray)
+import _bitsyn
+from _rng import as_rng
 
 __all__ = ['ErrorCorrectingCode', 'ErrorCheck', 'StabilizerCheck', 
             'toric_code', 'square_octagon_code', 'noisy_toric_code', 
@@ -37,105 +45,277 @@ class ErrorCheck(object):
     the correct syndrome to yield a noisy syndrome. 
 
     :type noise_model: tuple
+
+    :param primal_lattice: If provided, the lattice on which 
+    ``primal_sets`` lie, which can then also be an integer array of 
+    positions in ``primal_lattice.points`` (see 
+    :meth:`py_qcode.Lattice.support`). If ``rule`` is a dict whose 
+    keys are Pauli strings, it is expanded into a table indexed by the
+    packed errors on each set of primal points (see 
+    :meth:`py_qcode.Lattice.pack_errors`), so that no strings are 
+    joined or hashed during evaluation. Other rules are applied to the
+    errors on the points at those positions.
+
+    :type primal_lattice: :class:`py_qcode.Lattice`
     """
     def __init__(self, primal_sets, dual_points, rule,
-                    noise_model=(0., lambda a: a)):
+                    noise_model=(0., lambda a: a), primal_lattice=None):
 
         self.primal_sets = primal_sets
         self.dual_points = dual_points
         self.rule = rule
+        self.noise_model = noise_model
+        self.primal_lattice = primal_lattice
+        
+        #Sets of points, for rules applied to error strings; built on 
+        #first use if only their positions are given:
+        self._point_sets = primal_sets
+
+        if primal_lattice is None:
+            self.support = None
+        elif isinstance(primal_sets, ndarray):
+            self.support = primal_sets
+            self._point_sets = None
+        else:
+            #Integer positions of the primal points in each check:
+            self.support = array([map(primal_lattice._index, 
+                                    [pt.coords for pt in primal_set])
+                                    for primal_set in primal_sets],
+                                    dtype=int32)
+        
+        #Dict rules are checked once, here: if their keys are exactly 
+        #the Pauli errors on a set of primal points, no lookup can fail
+        #for Pauli errors, and table_lookup needn't look for missing 
+        #entries.
+        self._rule_table = None
+        self._rule_complete = False
+        if isinstance(rule, dict) and len(primal_sets) > 0:
+            length = len(primal_sets[0])
+            if all([isinstance(key, basestring) and len(key) == length
+                        and not key.strip('IXYZ') for key in rule]):
+                self._rule_complete = (len(rule) == 4 ** length)
+                if self.support is not None and \
+                    length <= _MAX_TABLE_LENGTH:
+                    self._rule_values, self._rule_table = \
+                                            _rule_table(rule, length)
+                    self._place_values = 4 ** arange(length - 1, -1, -1)
+        
+        #Whether syndromes are found from packed errors (see 
+        #ErrorCorrectingCode.measure):
+        self._packs_errors = self._rule_table is not None
+
+    def evaluate(self, rng=None):
+        self.write_values(self.syndromes(), rng)
+
+    def syndromes(self, bits=None):
+        """
+        Returns the syndrome of each set of primal points, before the
+        noise model is applied. ``bits`` can hold the output of 
+        ``primal_lattice.pack_errors()``, if it has already been found
+        (see :meth:`py_qcode.Lattice.pack_errors`).
+        """
+        if not isinstance(self.rule, (dict, FunctionType)):
+            raise TypeError("Rule used by error check must be a function or dict, you entered a value of type: " + str(type(self.rule)))
+
+        if self._rule_table is not None:
+            return self.table_lookup(bits)
+
+        if self._point_sets is None:
+            points = self.primal_lattice.points
+            self._point_sets = [[points[idx] for idx in row]
+                                    for row in self.support.tolist()]
+
+        #Use error on first point to decide how errors are joined, once
+        #for the whole check; errors which are neither Paulis nor 
+        #strings are added together:
+        first_error = self._point_sets[0][0].error
+        if type(first_error) is Pauli:
+            error_strs = [''.join([pt.error.op for pt in primal_set])
+                            for primal_set in self._point_sets]
+        elif isinstance(first_error, basestring):
+            error_strs = [''.join([pt.error for pt in primal_set])
+                            for primal_set in self._point_sets]
+        else:
+            error_strs = [_sum([pt.error for pt in primal_set])
+                            for primal_set in self._point_sets]
+
+        if isinstance(self.rule, dict):
+            try:
+                syndromes = map(self.rule.__getitem__, error_strs)
+            except KeyError as err:
+                raise KeyError("There is no entry in the lookup table for the error " + str(err.args[0]))
+        else:
+            syndromes = map(self.rule, error_strs)
+
+        return syndromes
+
+    def table_lookup(self, bits=None):
+        """
+        Packs the errors on ``primal_lattice`` into bits, unless they 
+        are given in ``bits``, and returns the syndrome for each set of
+        primal points by looking up its error in the table built from 
+        ``rule``.
+        """
+        if bits is None:
+            bits = self.primal_lattice.pack_errors()
+        z_bits, x_bits = bits
+        codes = x_bits[self.support] + 2 * z_bits[self.support]
+        #Codes are always in range, so take needn't check bounds:
+        entries = self._rule_table.take(codes.dot(self._place_values),
+                                            mode='clip')
+        if self._rule_complete:
+            return map(self._rule_values.__getitem__, entries.tolist())
         
-        def noise_func(syndrome):
-            prob, func = noise_model
-            val = rand()
-            if val < prob:
-                syndrome = func(syndrome)
-            return syndrome
+        missing = flatnonzero(entries < 0)
+        if len(missing) > 0:
+            error_str = ''.join([_PAULI_LETTERS[code] 
+                                    for code in codes[missing[0]]])
+            raise KeyError("There is no entry in the lookup table for the error " + error_str)
         
-        self.noise_func = noise_func
-
-    def evaluate(self):
-        for idx, point in enumerate(self.dual_points):
-            error_str = _sum([pt.error for pt in self.primal_sets[idx]])
-            if isinstance(self.rule, dict):
-                try:
-                    if point.syndrome is None:
-                        point.syndrome = \
-                                self.noise_func(self.rule[error_str])
-                    else:
-                        point.syndrome += \
-                                self.noise_func(self.rule[error_str])
-                
-                except KeyError:
-                    raise KeyError("There is no entry in the lookup table for the error " + error_str)
-                finally:
-                    pass
-            
-            elif isinstance(self.rule, FunctionType):
-                if point.syndrome is None:
-                    point.syndrome = \
-                            self.noise_func(self.rule(error_str))
-                else:
-                    point.syndrome += \
-                            self.noise_func(self.rule(error_str))
+        return map(self._rule_values.__getitem__, entries.tolist())
+
+    def write_values(self, syndromes, rng=None):
+        """
+        Writes a list of syndromes, one for each of ``dual_points``, 
+        after applying the noise model, with random numbers drawn from
+        ``rng`` (see :mod:`py_qcode._rng`). Syndromes are added to 
+        any that are already present on a point.
+        """
+        #Draw the noise for every syndrome at once, and only apply 
+        #the noise function to those which are flipped:
+        prob, func = self.noise_model
+        if prob > 0.:
+            syndromes = list(syndromes)
+            samples = as_rng(rng).random(len(syndromes))
+            flipped = flatnonzero(samples < prob)
+            for idx in flipped.tolist():
+                syndromes[idx] = func(syndromes[idx])
+
+        for point, syndrome in zip(self.dual_points, syndromes):
+            if point.syndrome is None:
+                point.syndrome = syndrome
             else:
-                raise TypeError("Rule used by error check must be a function or dict, you entered a value of type: " + type(self.rule))
+                point.syndrome += syndrome
 
 class StabilizerCheck(ErrorCheck):
     """
     subclass of :class:`py_qcode.ErrorCheck`, takes anything that can 
     be cast to a :class:`qecc.Pauli` instead of a rule, and uses 
     commutation to determine the syndrome. 
+
+    :param primal_lattice: If provided, the lattice on which 
+    ``primal_sets`` lie. Errors are then packed into bit arrays (see 
+    :meth:`py_qcode.Lattice.pack_errors`), and the syndromes for all 
+    dual points are found at once by a symplectic inner product, 
+    instead of by constructing a :class:`qecc.Pauli` for every point.
+    In this case, ``primal_sets`` can also be an integer array of 
+    positions in ``primal_lattice.points``, such as the output of 
+    :meth:`py_qcode.Lattice.support`.
+
+    :type primal_lattice: :class:`py_qcode.Lattice`
+
+    :param word_masks: The output of 
+    :func:`py_qcode._bitsyn.word_masks` for the support and the 
+    stabilizer, if it has already been found for another check.
+
+    :type word_masks: tuple
     """
     def __init__(self, primal_sets, dual_points, stabilizer,
-                     noise_model=(0., lambda a: a), indy_css=False):
+                     noise_model=(0., lambda a: a), indy_css=False,
+                     primal_lattice=None, word_masks=None):
         
         if type(stabilizer) is str:
             stabilizer = Pauli(stabilizer)
         
-        #returns 0 if error commutes with stabilizer, 1 if it anti-commutes
+        #Syndromes for commuting/anticommuting errors, either 0/1 or 
+        #the appropriate letter, X or Z:
         if indy_css == False:
-            stab_rule = lambda err_str: 1 - int(commutes_with(stabilizer)(Pauli(err_str)))
+            outcomes = (0, 1)
         else:
-            #Returns the appropriate letter, X or Z
-            def stab_rule(err_str):
-                if type(err_str) is str:
-                    err_pauli = Pauli(err_str)
-                elif type(err_str) is Pauli:
-                    err_pauli = err_str #Not legible, but works
-                else:
-                    raise TypeError("Input type to stabilizer rule not understood.")
-                
-                if all([ltr in 'xX' for ltr in stabilizer.op]):
-                    syn_str = 'Z'    
-                elif all([ltr in 'zZ' for ltr in stabilizer.op]):
-                    syn_str = 'X'
-                else:
-                    raise ValueError("CSS Stabilizers must be all-X or all-Z; you entered: {0}".format(stabilizer))
-
-                #print stabilizer, err_pauli, syn_str
-                if not(commutes_with(stabilizer)(err_pauli)):
-                    return syn_str
-                else:
-                    return ''
-
-        super(StabilizerCheck, self).__init__(primal_sets, dual_points, stab_rule, noise_model)
+            outcomes = ('', _css_letter(stabilizer))
+        commutator = commutes_with(stabilizer)
+
+        def stab_rule(err_str):
+            if type(err_str) is str:
+                err_pauli = Pauli(err_str)
+            elif type(err_str) is Pauli:
+                err_pauli = err_str #Not legible, but works
+            else:
+                raise TypeError("Input type to stabilizer rule not understood.")
+            return outcomes[not commutator(err_pauli)]
+
+        super(StabilizerCheck, self).__init__(primal_sets, dual_points,
+                                stab_rule, noise_model, primal_lattice)
 
         self.stabilizer = stabilizer
+        self._outcomes = outcomes
+        self._commutator = commutator
+        self._stab_ints = _symplectic(stabilizer.op)
+        self._packs_errors = self.support is not None
+        
+        if self.support is not None:
+            #Symplectic form of the stabilizer:
+            self._stab_x, self._stab_z = _symplectic_bits(stabilizer.op)
+            if word_masks is not None:
+                self._word_masks = word_masks
+            elif _bitsyn.available:
+                self._word_masks = _bitsyn.word_masks(self.support,
+                                            self._stab_x, self._stab_z)
+            else:
+                self._word_masks = None
+    
+    def anticommutations(self, bits=None):
+        """
+        Packs the errors on ``primal_lattice`` into bits, unless they 
+        are given in ``bits``, returning an array whose entries are 1 
+        if the error on the corresponding set of primal points 
+        anticommutes with the stabilizer and 0 otherwise.
+        """
+        if bits is None:
+            bits = self.primal_lattice.pack_errors()
+        z_bits, x_bits = bits
+        if self._word_masks is not None:
+            return _bitsyn.syndromes(z_bits, x_bits, self._word_masks)
+        
+        support = self.support
+        flips = (z_bits[support] & self._stab_x) ^ \
+                    (x_bits[support] & self._stab_z)
+        return bitwise_xor.reduce(flips, axis=1)
+
+    def write_syndromes(self, bits, rng=None):
+        """
+        Writes the syndromes corresponding to an array of 
+        anticommutation bits (see :meth:`anticommutations`) to 
+        ``dual_points``, after applying the noise model.
+        """
+        self.write_values(map(self._outcomes.__getitem__, bits.tolist()),
+                            rng)
+
+    def syndromes(self, bits=None):
+        if self.support is not None:
+            return map(self._outcomes.__getitem__, 
+                        self.anticommutations(bits).tolist())
         
-    def evaluate(self):
         #Use error on first point to typecheck
         test_error = self.primal_sets[0][0].error
         if type(test_error) is str:
-            super(StabilizerCheck, self).evaluate()
+            return super(StabilizerCheck, self).syndromes()
         elif type(test_error) is Pauli:
-            for idx, point in enumerate(self.dual_points):
-                multi_bit_error = reduce(lambda p1, p2: p1.tens(p2),
-                            [pt.error for pt in self.primal_sets[idx]])
-                if point.syndrome == None:
-                    point.syndrome = self.noise_func(self.rule(multi_bit_error))
-                else:
-                    point.syndrome += self.noise_func(self.rule(multi_bit_error))
+            #Phases don't affect commutation, so we only join the 
+            #operator strings, and take the symplectic inner product
+            #with the stabilizer directly:
+            stab_x, stab_z = self._stab_ints
+            outcomes = self._outcomes
+            syndromes = []
+            for primal_set in self.primal_sets:
+                err_x, err_z = _symplectic(''.join(
+                            [pt.error.op for pt in primal_set]))
+                anticommutes = bin((stab_x & err_z) ^ 
+                                    (stab_z & err_x)).count('1') & 1
+                syndromes.append(outcomes[anticommutes])
+            return syndromes
+        else:
+            return []
 
 class ErrorCorrectingCode():
     """
@@ -150,12 +330,22 @@ class ErrorCorrectingCode():
         self.parity_check_list = parity_check_list
         self.name = name
 
-    def measure(self):
+    def measure(self, rng=None):
         """
-        Evaluates all the parity checks.
+        Evaluates all the parity checks, drawing syndrome noise from 
+        ``rng`` (see :mod:`py_qcode._rng`).
         """
+        #Errors on each primal lattice are packed once, and shared by 
+        #the checks:
+        packed = {}
+        for check in self.parity_check_list:
+            lattice = check.primal_lattice
+            if check._packs_errors and id(lattice) not in packed:
+                packed[id(lattice)] = lattice.pack_errors()
+        
         for check in self.parity_check_list:
-            check.evaluate()
+            check.write_values(check.syndromes(
+                        packed.get(id(check.primal_lattice))), rng)
 
 #UTILITY FUNCTIONS
 def toric_code(primal_grid, dual_grid):
@@ -163,19 +353,13 @@ def toric_code(primal_grid, dual_grid):
     Uses a few convenience functions to produce the toric code on a set
     of square lattices.
     """
-    star_coords = _even_evens(*dual_grid.size)    
-    star_duals = [dual_grid[coord] for coord in star_coords]
-    star_primal = [primal_grid.neighbours(coord) 
-                    for coord in star_coords]
-    star_check = StabilizerCheck(star_primal, star_duals, 'XXXX',
-                                                    indy_css=True)
+    star_impl, plaq_impl = _build_toric_code_impl(primal_grid)
     
-    plaq_coords = _odd_odds(*dual_grid.size)    
-    plaq_duals = [dual_grid[coord] for coord in plaq_coords]
-    plaq_primal = [primal_grid.neighbours(coord) 
-                    for coord in plaq_coords]
-    plaq_check = StabilizerCheck(plaq_primal, plaq_duals, 'ZZZZ', 
-                                                    indy_css=True)
+    star_duals = dual_grid[_even_evens_array(*dual_grid.size)]
+    star_check = _bind_check(star_impl, primal_grid, star_duals)
+    
+    plaq_duals = dual_grid[_odd_odds_array(*dual_grid.size)]
+    plaq_check = _bind_check(plaq_impl, primal_grid, plaq_duals)
 
     return ErrorCorrectingCode([star_check, plaq_check], name="Toric Code")
 
@@ -185,27 +369,18 @@ def square_octagon_code(primal_grid, dual_grid):
     toric/[[4,2,2]] code on a set of square lattices.
     """
     nx, ny = primal_grid.size
+    sq_x_impl, sq_z_impl, x_oct_impl, z_oct_impl = \
+                                    _build_squoct_impl(primal_grid)
 
-    sq_coords = _squoct_affine_map(skew_coords(nx, ny))
-    sq_duals = [dual_grid[coord] for coord in sq_coords]
-    sq_primal = primal_grid.squares()
-    sq_check_X = StabilizerCheck(sq_primal, sq_duals, 'XXXX',
-                                                    indy_css=True)
-    
-    sq_check_Z = StabilizerCheck(sq_primal, sq_duals, 'ZZZZ',
-                                                    indy_css=True)
+    sq_duals = dual_grid[_squoct_square_array(nx, ny)]
+    sq_check_X = _bind_check(sq_x_impl, primal_grid, sq_duals)
+    sq_check_Z = _bind_check(sq_z_impl, primal_grid, sq_duals)
     
-    x_oct_coords = _squoct_affine_map(_even_evens(nx, ny))
-    x_oct_duals = [dual_grid[coord] for coord in x_oct_coords]
-    x_oct_primal = primal_grid.x_octagons()
-    x_oct_check = StabilizerCheck(x_oct_primal, x_oct_duals,
-                                        'XXXXXXXX', indy_css=True)
+    x_oct_duals = dual_grid[_squoct_x_octagon_array(nx, ny)]
+    x_oct_check = _bind_check(x_oct_impl, primal_grid, x_oct_duals)
     
-    z_oct_coords = _squoct_affine_map(_odd_odds(nx, ny))
-    z_oct_duals = [dual_grid[coord] for coord in z_oct_coords]
-    z_oct_primal = primal_grid.z_octagons()
-    z_oct_check = StabilizerCheck(z_oct_primal, z_oct_duals,
-                                        'ZZZZZZZZ', indy_css=True)
+    z_oct_duals = dual_grid[_squoct_z_octagon_array(nx, ny)]
+    z_oct_check = _bind_check(z_oct_impl, primal_grid, z_oct_duals)
 
     return ErrorCorrectingCode([sq_check_Z, sq_check_X,
                                 x_oct_check, z_oct_check], 
@@ -216,21 +391,15 @@ def noisy_toric_code(primal_grid, dual_grid, error_rate):
     Uses a few convenience functions to produce the toric code on a set
     of square lattices, this time with noisy syndrome checks.
     """
-    star_coords = _even_evens(*dual_grid.size)    
-    star_duals = [dual_grid[coord] for coord in star_coords]
-    star_primal = [primal_grid.neighbours(coord) 
-                    for coord in star_coords]
+    star_impl, plaq_impl = _build_toric_code_impl(primal_grid)
     
-    star_check = StabilizerCheck(star_primal, star_duals, 'XXXX',
-        (error_rate, z_flip), indy_css=True)
+    star_duals = dual_grid[_even_evens_array(*dual_grid.size)]
+    star_check = _bind_check(star_impl, primal_grid, star_duals,
+                                (error_rate, z_flip))
     
-    plaq_coords = _odd_odds(*dual_grid.size)    
-    plaq_duals = [dual_grid[coord] for coord in plaq_coords]
-    plaq_primal = [primal_grid.neighbours(coord) 
-                    for coord in plaq_coords]
-    
-    plaq_check = StabilizerCheck(plaq_primal, plaq_duals, 'ZZZZ', 
-        (error_rate, x_flip), indy_css=True)
+    plaq_duals = dual_grid[_odd_odds_array(*dual_grid.size)]
+    plaq_check = _bind_check(plaq_impl, primal_grid, plaq_duals,
+                                (error_rate, x_flip))
 
     return ErrorCorrectingCode([star_check, plaq_check], 
                                 name="Noisy Toric Code")
@@ -241,45 +410,139 @@ def noisy_squoct_code(primal_grid, dual_grid, error_rate):
     toric/[[4,2,2]] code on a set of square lattices.
     """
     nx, ny = primal_grid.size
-
-    sq_coords = _squoct_affine_map(skew_coords(nx, ny))
-    sq_duals = [dual_grid[coord] for coord in sq_coords]
-    sq_primal = primal_grid.squares()
-    sq_check_X = StabilizerCheck(sq_primal, sq_duals, 'XXXX',
-                        (error_rate, z_flip), indy_css=True)
+    sq_x_impl, sq_z_impl, x_oct_impl, z_oct_impl = \
+                                    _build_squoct_impl(primal_grid)
+
+    sq_duals = dual_grid[_squoct_square_array(nx, ny)]
+    sq_check_X = _bind_check(sq_x_impl, primal_grid, sq_duals,
+                                (error_rate, z_flip))
+    sq_check_Z = _bind_check(sq_z_impl, primal_grid, sq_duals,
+                                (error_rate, x_flip))
     
-    sq_check_Z = StabilizerCheck(sq_primal, sq_duals, 'ZZZZ',
-                        (error_rate, x_flip), indy_css=True)
+    x_oct_duals = dual_grid[_squoct_x_octagon_array(nx, ny)]
+    x_oct_check = _bind_check(x_oct_impl, primal_grid, x_oct_duals,
+                                (error_rate, z_flip))
     
-    x_oct_coords = _squoct_affine_map(_even_evens(nx, ny))
-    x_oct_duals = [dual_grid[coord] for coord in x_oct_coords]
-    x_oct_primal = primal_grid.x_octagons()
-    x_oct_check = StabilizerCheck(x_oct_primal, x_oct_duals,
-                    'XXXXXXXX', (error_rate, z_flip), indy_css=True)
-    
-    z_oct_coords = _squoct_affine_map(_odd_odds(nx, ny))
-    z_oct_duals = [dual_grid[coord] for coord in z_oct_coords]
-    z_oct_primal = primal_grid.z_octagons()
-    z_oct_check = StabilizerCheck(z_oct_primal, z_oct_duals,
-                    'ZZZZZZZZ', (error_rate, x_flip), indy_css=True)
+    z_oct_duals = dual_grid[_squoct_z_octagon_array(nx, ny)]
+    z_oct_check = _bind_check(z_oct_impl, primal_grid, z_oct_duals,
+                                (error_rate, x_flip))
 
     return ErrorCorrectingCode([sq_check_Z, sq_check_X,
                                 x_oct_check, z_oct_check], 
                                 name="Noisy Square-Octagon Code")
 
-def letter_flip(synd, letter):
+#Parts of the codes above which only depend on the type and size of the
+#primal lattice, memoized by _build_code_impl (there's no 
+#functools.lru_cache in Python 2):
+_CODE_IMPLS = {}
+
+def _build_code_impl(primal_grid, checks):
     """
-    This is a convenience function used to 'noise up' input syndromes.
+    Returns a ``(support, stabilizer, word_masks)`` tuple for each 
+    ``(name, stabilizer)`` pair in ``checks``, where ``support`` is 
+    ``primal_grid.support(name)``, and ``word_masks`` is the 
+    corresponding input to :func:`py_qcode._bitsyn.syndromes` (or 
+    ``None`` if ``libbitsyn.so`` isn't built). These are shared by all
+    codes built on lattices like ``primal_grid``, e.g. in a sweep over 
+    error rates.
     """
-    #print synd
-    if synd == letter:
-        return ''
-    elif synd == '':
-        return letter
+    key = (primal_grid.__class__.__name__, tuple(primal_grid.size),
+            primal_grid.is_dual, checks)
+    try:
+        return _CODE_IMPLS[key]
+    except KeyError:
+        impls = []
+        for name, stabilizer in checks:
+            support = primal_grid.support(name)
+            if _bitsyn.available:
+                stab_x, stab_z = _symplectic_bits(stabilizer)
+                word_masks = _bitsyn.word_masks(support, stab_x, stab_z)
+            else:
+                word_masks = None
+            impls.append((support, stabilizer, word_masks))
+        _CODE_IMPLS[key] = impls
+        return impls
+
+def _build_toric_code_impl(primal_grid):
+    return _build_code_impl(primal_grid, (('star', 'XXXX'), 
+                                            ('plaquette', 'ZZZZ')))
+
+def _build_squoct_impl(primal_grid):
+    return _build_code_impl(primal_grid, (('square', 'XXXX'), 
+                                            ('square', 'ZZZZ'),
+                                            ('x_octagon', 'XXXXXXXX'),
+                                            ('z_octagon', 'ZZZZZZZZ')))
+
+def _bind_check(impl, primal_grid, dual_points, noise_model=(0., lambda a: a)):
+    """
+    Makes a CSS :class:`py_qcode.StabilizerCheck` on ``primal_grid`` 
+    from one of the tuples returned by :func:`_build_code_impl`.
+    """
+    support, stabilizer, word_masks = impl
+    return StabilizerCheck(support, dual_points, stabilizer, noise_model,
+                            indy_css=True, primal_lattice=primal_grid,
+                            word_masks=word_masks)
+
+def _css_letter(stabilizer):
+    """
+    Returns the syndrome letter produced by a CSS stabilizer when it 
+    anticommutes with an error: 'Z' for all-X stabilizers, and 'X' for
+    all-Z stabilizers.
+    """
+    if all([ltr in 'xX' for ltr in stabilizer.op]):
+        return 'Z'
+    elif all([ltr in 'zZ' for ltr in stabilizer.op]):
+        return 'X'
     else:
-        raise ValueError("Unknown syndrome: {0}".format(synd))
+        raise ValueError("CSS Stabilizers must be all-X or all-Z; you entered: {0}".format(stabilizer))
+
+#Single-qubit Paulis in the order of their packed codes, x + 2z (see
+#py_qcode.Lattice.pack_errors), and the longest error string for which
+#a dict rule is expanded into a table, with 4 ** length entries:
+_PAULI_LETTERS = 'IXZY'
+_MAX_TABLE_LENGTH = 8
 
-z_flip = lambda synd: letter_flip(synd, 'Z')
-x_flip = lambda synd: letter_flip(synd, 'X')
+def _rule_table(rule, length):
+    """
+    Expands a dict taking Pauli strings of length ``length`` to 
+    syndromes into a tuple of the distinct syndromes, and an integer 
+    array giving the position in that tuple of the syndrome for each 
+    error, indexed by the base-4 number whose digits are the packed 
+    codes of its letters. Errors which are not in ``rule`` are marked 
+    by -1.
+    """
+    values = []
+    table = empty(4 ** length, dtype=int32)
+    for code, letters in enumerate(product(_PAULI_LETTERS, 
+                                            repeat=length)):
+        try:
+            syndrome = rule[''.join(letters)]
+        except KeyError:
+            table[code] = -1
+            continue
+        if syndrome not in values:
+            values.append(syndrome)
+        table[code] = values.index(syndrome)
+    return tuple(values), table
 
 _sum = lambda iterable: reduce(lambda a, b: a + b, iterable)
+
+#Tables taking each letter of a Pauli operator string to its X- or 
+#Z-bit as '0' or '1', built from the same tables as _symplectic_bits:
+_ALL_CHARS = ''.join(map(chr, range(256)))
+_X_TRANS = maketrans(_ALL_CHARS, ''.join(['01'[bit] for bit in _X_BITS]))
+_Z_TRANS = maketrans(_ALL_CHARS, ''.join(['01'[bit] for bit in _Z_BITS]))
+
+def _symplectic(op):
+    """
+    Packs a Pauli operator string into a pair of integers, whose bits 
+    mark the qubits with an X and a Z component, respectively.
+    """
+    return int(op.translate(_X_TRANS), 2), int(op.translate(_Z_TRANS), 2)
+
+#Convenience functions used to 'noise up' input syndromes, by adding 
+#or removing the appropriate letter:
+_Z_FLIP = {'Z': '', '': 'Z'}
+_X_FLIP = {'X': '', '': 'X'}
+
+z_flip, x_flip = _Z_FLIP.__getitem__, _X_FLIP.__getitem__
@@ -1,5 +1,6 @@
-from numpy.random import rand
+from numpy import cumsum, searchsorted
 from qecc import Pauli
+from _rng import as_rng
 
 ## ALL ##
 __all__ = ['ErrorModel', 'PauliErrorModel', 'depolarizing_model', 'iidxz_model']
@@ -44,9 +45,15 @@ class ErrorModel(object):
                 for prob_op in self.prob_op_list])
 
     #Other Methods
-    def act_on(self, lattice):
-        for point in lattice.points:
-            point.error = _action(self.prob_op_list, rand())
+    def act_on(self, lattice, rng=None):
+        """
+        Applies an error to every point on ``lattice``, drawing the 
+        random numbers for all points at once from ``rng`` (see 
+        :mod:`py_qcode._rng`).
+        """
+        samples = as_rng(rng).random(len(lattice.points))
+        for point, sample in zip(lattice.points, samples.tolist()):
+            point.error = _action(self.prob_op_list, sample)
 
 class PauliErrorModel(ErrorModel):
     def __init__(self, prob_op_list):
@@ -57,10 +64,20 @@ class PauliErrorModel(ErrorModel):
                     .format(prob_op[1], PAULIS))
 
         super(PauliErrorModel, self).__init__(prob_op_list)
-
-    def act_on(self, lattice):
-        for point in lattice.points:
-            new_pauli = Pauli(_action(self.prob_op_list, rand()))
+        
+        #Paulis are never modified in place, so each point can share 
+        #the same few objects:
+        probs, ops = zip(*prob_op_list)
+        self._cum_probs = cumsum(probs)
+        self._paulis = map(Pauli, ops)
+
+    def act_on(self, lattice, rng=None):
+        samples = as_rng(rng).random(len(lattice.points))
+        #The last operator also catches samples above the rounded sum:
+        op_idxs = searchsorted(self._cum_probs[:-1], samples, side='right')
+        paulis = self._paulis
+        for point, op_idx in zip(lattice.points, op_idxs.tolist()):
+            new_pauli = paulis[op_idx]
             if point.error is None:
                 point.error = new_pauli
             else:
@@ -6,6 +6,9 @@ Ben Criger
 from itertools import product
 from math import floor
 from ctypes import c_ushort, c_char, cdll
+from numpy import array, frombuffer, int32, ndarray, uint8, where, zeros
+from qecc import Pauli
+import _cache
 import os.path
 path_to_lib = os.path.join(os.path.dirname(__file__), 'libqcode_dist.so')
 #libqcode_dist = cdll.LoadLibrary(os.path.join(me, 'libqcode_dist.so'))
@@ -26,6 +29,33 @@ __all__.extend(['skew_coords', '_squoct_affine_map', 'straight_octagon_dist',
 ##constants##
 SIDES = ['u', 'd', 'r', 'l', 'f', 'b'] #up, down, left, right, front, back
 
+#Lookup tables taking the ASCII code of a single-qubit Pauli to its
+#symplectic (Z-bit, X-bit) representation, used by Lattice.pack_errors:
+_Z_BITS = zeros(256, dtype=uint8)
+_X_BITS = zeros(256, dtype=uint8)
+_IS_PAULI = zeros(256, dtype=bool)
+for _ltr in 'IXYZixyz':
+    _Z_BITS[ord(_ltr)] = _ltr in 'YZyz'
+    _X_BITS[ord(_ltr)] = _ltr in 'XYxy'
+    _IS_PAULI[ord(_ltr)] = True
+
+def _symplectic_bits(op):
+    """
+    Returns the symplectic form of a Pauli operator string, as arrays 
+    of the X- and Z-bits of its letters, using the same tables as 
+    :meth:`Lattice.pack_errors`.
+    """
+    codes = frombuffer(op, dtype=uint8)
+    return _X_BITS[codes], _Z_BITS[codes]
+
+#Part of the key of every support cached on disk, so that changes to 
+#the index logic in this module invalidate them (see Lattice.support):
+_SOURCE_DIGEST = _cache.source_digest(__file__)
+
+#Inverse map, indexed by X-bit + 2 * Z-bit. Sharing these is safe, since
+#Pauli multiplication (including *=) returns a new object:
+_BITS_TO_PAULI = map(Pauli, 'IXZY')
+
 class Point(object):
     r"""
     Represents a point in two or three dimensions. Normally, I'd use a
@@ -111,13 +141,15 @@ class Lattice(object):
         self.size = size
         self.is_dual = is_dual
 
+        #Index arrays for named sets of points, see support
+        self._support_cache = {}
+
     def __getitem__(self, key):
-        if len(key) != len(self.points[0]):
-            raise ValueError("key must be length: " + str(len(self.points[0])))
-        for point in self.points:
-            if point.coords == tuple(key):
-                return point
-        raise KeyError("Point not found on lattice; key: "+ str(key))
+        #An array of co-ordinate pairs gives a list of points:
+        if isinstance(key, ndarray) and key.ndim == 2:
+            points = self.points
+            return [points[idx] for idx in self._index_array(key).tolist()]
+        return self.points[self._index(key)]
     
     def __repr__(self):
         pts = map(lambda pt: repr(pt), self.points)
@@ -128,6 +160,82 @@ class Lattice(object):
         for point in self.points:
             point.clear()
 
+    def _index(self, key):
+        """
+        Returns the position in ``self.points`` of the point with 
+        co-ordinates ``key``. Subclasses with a regular layout override
+        this with a closed-form expression.
+        """
+        if len(key) != len(self.points[0]):
+            raise ValueError("key must be length: " + str(len(self.points[0])))
+        for idx, point in enumerate(self.points):
+            if point.coords == tuple(key):
+                return idx
+        raise KeyError("Point not found on lattice; key: "+ str(key))
+
+    def _index_array(self, coords):
+        """
+        Returns an ``int32`` array of the positions in ``self.points``
+        of the points whose co-ordinates are the rows of ``coords``. 
+        Subclasses with a closed-form ``_index`` override this with a 
+        vectorized version.
+        """
+        return array(map(self._index, map(tuple, coords.tolist())), 
+                        dtype=int32)
+
+    def pack_errors(self):
+        """
+        Translates the single-qubit Pauli errors on the lattice (either
+        :class:`qecc.Pauli` objects or strings, with ``None`` taken to 
+        be the identity) into two arrays of bits, ``z_bits`` and 
+        ``x_bits``, indexed in the same order as ``self.points``, which
+        are returned.
+        """
+        ops = ''.join([getattr(point.error, 'op', point.error) or 'I'
+                        for point in self.points])
+        codes = frombuffer(ops, dtype=uint8)
+        if len(codes) != len(self.points) or not _IS_PAULI[codes].all():
+            raise ValueError("Only single-qubit Pauli errors can be "+\
+                "packed into bits.")
+        
+        return _Z_BITS[codes], _X_BITS[codes]
+
+    def unpack_errors(self, z_bits, x_bits):
+        """
+        Inverse of :meth:`pack_errors`, sets the error on every point 
+        to the :class:`qecc.Pauli` given by its entries in ``z_bits`` 
+        and ``x_bits``.
+        """
+        for point, code in zip(self.points, (x_bits + 2 * z_bits).tolist()):
+            point.error = _BITS_TO_PAULI[code]
+
+    def support(self, name):
+        """
+        Returns a 2D ``int32`` array, each row of which contains the 
+        positions in ``self.points`` of one of the sets of points 
+        called ``name`` (e.g. ``'star'``). The array is built once from
+        the co-ordinates given by ``_support_coords`` and then cached,
+        both on the lattice and on disk (see :mod:`py_qcode._cache`), 
+        since the topology of the lattice does not change.
+        """
+        try:
+            return self._support_cache[name]
+        except KeyError:
+            key = (_SOURCE_DIGEST, self.__class__.__name__, 
+                    tuple(self.size), self.is_dual, name)
+            def build():
+                coords = array(self._support_coords(name), dtype=int32)
+                return self._index_array(coords.reshape(-1, 2)).reshape(
+                                                        coords.shape[:2])
+            support = _cache.get_or_build(key, build)
+            support.flags.writeable = False #shared between codes
+            self._support_cache[name] = support
+            return support
+
+    def _support_coords(self, name):
+        raise ValueError("{0} has no sets of points called {1}.".format(
+                            self.__class__.__name__, name))
+
 class SquareLattice(Lattice):
     """
     Represents a lattice in which qubits are placed on the edges of a grid of squares with size given by `sz_tpl`. 
@@ -173,6 +281,7 @@ class SquareLattice(Lattice):
         super(SquareLattice, self).__init__(points, dim, dist)
         self.size = sz_tpl
         self.is_dual = is_dual
+        self._neighbours_cache = {}
         
         if all([side in SIDES for side in rough_sides]):
             self.rough_sides = rough_sides
@@ -180,23 +289,39 @@ class SquareLattice(Lattice):
             raise ValueError(("rough_sides must be in the list {0}." +\
                 "You entered: {1}").format(SIDES, rough_sides))
     
-    #Overwriting __getitem__ for increased speed:
-    def __getitem__(self, coord_pair):
+    #Overwriting _index for increased speed:
+    def _index(self, coord_pair):
         x, y = coord_pair
         sz_x = self.size[0]
         shift = -(x % 2) if self.is_dual else x % 2 - 1
-        return self.points[x * sz_x + (y + shift) / 2]
+        return x * sz_x + (y + shift) / 2
+
+    def _index_array(self, coords):
+        x, y = coords[:, 0], coords[:, 1]
+        shift = -(x % 2) if self.is_dual else x % 2 - 1
+        return (x * self.size[0] + (y + shift) // 2).astype(int32)
 
     def neighbours(self, location):
         """
         Returns a list of points which are one unit of distance away from a given location.
         Convenience method used to define stars and plaquettes below.
+        Results are memoized, the lattice topology being fixed.
 
         June 6, 2014: Only supports closed_boundary 
 
         TODO: Make this depend on the distance function, so that it can be made
         a method of Lattice, overridden by SquareLattice.
         """
+        location = tuple(location)
+        try:
+            return self._neighbours_cache[location]
+        except KeyError:
+            nbrs = tuple(map(self.__getitem__, 
+                                self._neighbour_coords(location)))
+            self._neighbours_cache[location] = nbrs
+            return nbrs
+
+    def _neighbour_coords(self, location):
         x, y = location
         x_sz, y_sz = self.size
         
@@ -205,7 +330,16 @@ class SquareLattice(Lattice):
         up    = (y + 1) % (2 * y_sz)
         down  = (y - 1) % (2 * y_sz)
         
-        return (self[right, y], self[x, up], self[left, y], self[x, down])
+        return [(right, y), (x, up), (left, y), (x, down)]
+
+    def _support_coords(self, name):
+        if name == 'star':
+            centers = _even_evens(*self.size)
+        elif name == 'plaquette':
+            centers = _odd_odds(*self.size)
+        else:
+            return super(SquareLattice, self)._support_coords(name)
+        return map(self._neighbour_coords, centers)
 
     def stars(self):
         return map(self.neighbours, _even_evens(*self.size))
@@ -332,8 +466,14 @@ class SquareOctagonLattice(Lattice):
         self.size = x_len, y_len
         
         self.total_size = (total_x, total_y)
+        
+        #Positions in self.points of the qubits around each square and
+        #octagon, see squares/x_octagons/z_octagons:
+        self._squares_idx = self.support('square')
+        self._x_octagons_idx = self.support('x_octagon')
+        self._z_octagons_idx = self.support('z_octagon')
     
-    def __getitem__(self, coord_pair):
+    def _index(self, coord_pair):
         x, y = coord_pair
         sz_y = self.size[1] * 2
         num_blocks_ahead = (x + int(floor(x / 3))) / 2
@@ -341,12 +481,52 @@ class SquareOctagonLattice(Lattice):
         num_elems_ahead = y - shift #2, 4, 8, 10, ...
         num_elems_ahead -= 2 * (1 + int(floor(y / 6))) #0, 2, 4, 6 ...
         num_elems_ahead /= 2 #0, 1, 2, 3
-        return self.points[num_blocks_ahead * sz_y + num_elems_ahead]
+        return num_blocks_ahead * sz_y + num_elems_ahead
+
+    def _index_array(self, coords):
+        x, y = coords[:, 0], coords[:, 1]
+        num_blocks_ahead = (x + x // 3) // 2
+        num_elems_ahead = (y - where(x % 2, -2, 1) - 2 * (1 + y // 6)) // 2
+        return (num_blocks_ahead * self.size[1] * 2 + 
+                    num_elems_ahead).astype(int32)
 
     def squares(self):
+        """
+        Returns an ``int32`` array with one row per square, holding the
+        positions in ``self.points`` of its four qubits.
+        """
+        return self._squares_idx
+
+    def z_octagons(self):
+        """
+        As :meth:`squares`, with eight columns, for the octagons 
+        measured by ``ZZZZZZZZ``.
+        """
+        return self._z_octagons_idx
+
+    def x_octagons(self):
+        """
+        As :meth:`squares`, with eight columns, for the octagons 
+        measured by ``XXXXXXXX``.
+        """
+        return self._x_octagons_idx
+
+    def _support_coords(self, name):
         nx, ny = self.size
-        square_centers = _squoct_affine_map(skew_coords(nx, ny))
-        point_list = []
+        if name == 'square':
+            return self._square_coords(
+                        _squoct_affine_map(skew_coords(nx, ny)))
+        elif name == 'x_octagon':
+            return self._octagon_coords(
+                        _squoct_affine_map(_even_evens(nx, ny)))
+        elif name == 'z_octagon':
+            return self._octagon_coords(
+                        _squoct_affine_map(_odd_odds(nx, ny)))
+        else:
+            return super(SquareOctagonLattice, self)._support_coords(name)
+
+    def _square_coords(self, square_centers):
+        coord_list = []
         
         s_x, s_y = self.total_size
         for pt in square_centers:
@@ -355,17 +535,15 @@ class SquareOctagonLattice(Lattice):
             left, right = (x - 1) % s_x, (x + 1) % s_x
             down, up    = (y - 1) % s_y, (y + 1) % s_y
             
-            point_list.append([self[(left, down)],  self[(left, up)],
-                    self[(right, down)], self[(right, up)]])
+            coord_list.append([(left, down), (left, up),
+                                (right, down), (right, up)])
         
-        return point_list
+        return coord_list
 
-    def z_octagons(self):
-        nx, ny = self.size
-        squoct_z_oct_centers = _squoct_affine_map(_odd_odds(nx, ny))
+    def _octagon_coords(self, octagon_centers):
         s_x, s_y = self.total_size
-        point_list = []
-        for pt in squoct_z_oct_centers:
+        coord_list = []
+        for pt in octagon_centers:
             x, y = pt
             
             xm2, xm1, xp1, xp2 = map(lambda x: x % s_x,
@@ -374,30 +552,10 @@ class SquareOctagonLattice(Lattice):
             ym2, ym1, yp1, yp2 = map(lambda y: y % s_y,
                                 [(y - 2), (y - 1), (y + 1), (y + 2)])
             
-            point_list.append(map(self.__getitem__, [(xm2, ym1), (xm2, yp1), (xm1, ym2),
+            coord_list.append([(xm2, ym1), (xm2, yp1), (xm1, ym2),
                                 (xp1, ym2), (xp1, yp2), (xm1, yp2),
-                                (xp2, ym1), (xp2, yp1)]))
-        return point_list
-
-    def x_octagons(self):
-        #TODO: Un-copy this code, invoke a private function.
-        nx, ny = self.size
-        squoct_x_oct_centers = _squoct_affine_map(_even_evens(nx, ny))
-        s_x, s_y = self.total_size
-        point_list = []
-        for pt in squoct_x_oct_centers:
-            x, y = pt
-            
-            xm2, xm1, xp1, xp2 = map(lambda x: x % s_x,
-                                [(x - 2), (x - 1), (x + 1), (x + 2)])
-            
-            ym2, ym1, yp1, yp2 = map(lambda y: y % s_y,
-                                [(y - 2), (y - 1), (y + 1), (y + 2)])
-            
-            point_list.append(map(self.__getitem__, [(xm2, ym1), (xm2, yp1), (xm1, ym2),
-                                (xp1, ym2), (xp1, yp2), (xm1, yp2),
-                                (xp2, ym1), (xp2, yp1)]))
-        return point_list
+                                (xp2, ym1), (xp2, yp1)])
+        return coord_list
 
     def min_distance_path(self, dual_start, dual_end, synd_type):
         """
@@ -444,10 +602,6 @@ class UnionJackLattice(Lattice):
         max_x, max_y = 2 * x_len - 1, 2 * y_len - 1
         total_size = sq2oct(max_x) + 2, sq2oct(max_y) + 2
         
-        def __getitem__(self, coord_pair):
-            sz_y = self.size[1] * 2
-            x, y = (x - 1)/3, (y - 1)/3
-            return self.points[x * sz_y + y]
         '''
         def dist(pt1, pt2, synd_type):
             """
@@ -491,6 +645,15 @@ class UnionJackLattice(Lattice):
         self.size = x_len, y_len
         self.total_size = total_size
 
+    #Points are sorted images of a full square grid under sq2oct:
+    def _index(self, coord_pair):
+        x, y = coord_pair
+        return oct2sq(x) * 2 * self.size[1] + oct2sq(y)
+
+    def _index_array(self, coords):
+        return (((coords[:, 0] - 1) // 3) * 2 * self.size[1] + 
+                    (coords[:, 1] - 1) // 3).astype(int32)
+
 class CubicLattice(Lattice):
     """
     Represents a lattice in which qubits are placed on the intersections of the diagonals of squares, as well as their corners. 
@@ -608,6 +771,34 @@ def _squoct_affine_map(tpl_lst):
     """
     return map(lambda tpl: tuple(map(sq2oct, tpl)), tpl_lst)
 
+def _cached_coords(coord_func):
+    """
+    Memoizes a function of the lattice size returning a list of 
+    co-ordinate pairs, as a read-only ``n``-by-2 ``int32`` array, which 
+    can be used to index a lattice (see :meth:`Lattice.__getitem__`).
+    """
+    cache = {}
+    def coord_array(nx, ny):
+        try:
+            return cache[nx, ny]
+        except KeyError:
+            coords = array(coord_func(nx, ny), dtype=int32).reshape(-1, 2)
+            coords.flags.writeable = False
+            cache[nx, ny] = coords
+            return coords
+    return coord_array
+
+_even_evens_array = _cached_coords(_even_evens)
+_odd_odds_array = _cached_coords(_odd_odds)
+
+#Centers of squares and octagons on the UnionJackLattice:
+_squoct_square_array = _cached_coords(
+                    lambda nx, ny: _squoct_affine_map(skew_coords(nx, ny)))
+_squoct_x_octagon_array = _cached_coords(
+                    lambda nx, ny: _squoct_affine_map(_even_evens(nx, ny)))
+_squoct_z_octagon_array = _cached_coords(
+                    lambda nx, ny: _squoct_affine_map(_odd_odds(nx, ny)))
+
 def straight_octagon_dist(x1, x2, sz):
     """
     Input two numbers which are raw one-d coordinates of octagons 
@@ -1,26 +1,62 @@
-from qecc import Pauli, com
-from lattice import _evens, _odds
+from qecc import Pauli
+from lattice import _evens, _odds, _symplectic_bits
+from numpy import array, bitwise_xor, int32
+import _bitsyn
 
 __all__ = ['LogicalOperator', 'toric_log_ops', 'squoct_log_ops']
 
 class LogicalOperator():
     """
     This class wraps a function which tests anticommutation on a 
-    lattice.
+    lattice. The positions of ``coord_list`` in the lattice, and the 
+    symplectic form of ``pauli``, are found the first time the operator
+    is tested on a given lattice, so that later tests only need the 
+    errors on the lattice packed into bits (see 
+    :meth:`py_qcode.Lattice.pack_errors`).
     """
     def __init__(self, name, pauli, coord_list):
         self.name = name
         self.pauli = pauli
         self.coord_list = coord_list
+        self._lattice = None
 
     def __repr__(self):
         return 'Operator {0}: {1} on coordinates {2}'.format(
             self.name, self.pauli, self.coord_list)
     
-    def test(self, lattice):
-        test_pauli = reduce(lambda a, b: a.tens(b), 
-                        [lattice[coord].error for coord in self.coord_list])
-        return self.name, com(test_pauli, self.pauli)
+    def test(self, lattice, bits=None):
+        """
+        Returns the name of the operator, and 1 if it anticommutes with
+        the error on ``lattice`` or 0 if it commutes. ``bits`` can hold
+        the output of ``lattice.pack_errors()``, if it has already been
+        found.
+        """
+        if self._lattice is not lattice:
+            self._set_lattice(lattice)
+        if bits is None:
+            bits = lattice.pack_errors()
+        z_bits, x_bits = bits
+        
+        if self._word_masks is not None:
+            anticommutes = _bitsyn.syndromes(z_bits, x_bits, 
+                                                self._word_masks)[0]
+        else:
+            support = self._support
+            anticommutes = bitwise_xor.reduce(
+                (z_bits[support] & self._op_x) ^ 
+                (x_bits[support] & self._op_z))
+        return self.name, int(anticommutes)
+
+    def _set_lattice(self, lattice):
+        self._support = array(map(lattice._index, self.coord_list),
+                                dtype=int32)
+        self._op_x, self._op_z = _symplectic_bits(self.pauli.op)
+        if _bitsyn.available:
+            self._word_masks = _bitsyn.word_masks(
+                    self._support.reshape(1, -1), self._op_x, self._op_z)
+        else:
+            self._word_masks = None
+        self._lattice = lattice
 
 def toric_log_ops(sz_tpl):
     """
@@ -1,5 +1,10 @@
-import cPickle as pkl
+try:
+    import cPickle as pkl
+except ImportError:
+    import pickle as pkl
 from collections import Iterable
+from _kernels import pauli_cum_probs, stack_checks, sample_trials
+from _rng import as_rng
 #from utils import syndrome_print, error_print
 
 __all__ = ['Simulation', 'FTSimulation']
@@ -37,10 +42,15 @@ class Simulation():
     :param logical_error: Commutation relations between the logical operators and the product of the guessed error and the actual error.
 
     :type logical_error: list
+
+    :param rng: The source of random numbers for errors and syndrome noise. `None` uses NumPy's global state, so that :func:`numpy.random.seed` applies; an integer seeds a new generator from :func:`py_qcode._rng.default_rng`, and a generator is used as-is.
+
+    :type rng: `None`, integer or generator
     """
     #Magic Methods
     def __init__(self, lattice, dual_lattice, error_model, code, 
-                                decoder, logical_operators, n_trials):
+                                decoder, logical_operators, n_trials,
+                                rng=None):
 
         #Defined objects
         self.lattice = lattice
@@ -57,10 +67,13 @@ class Simulation():
         #Integer
         self.n_trials = n_trials
         
+        #Created once and passed down to the error model and the code
+        self.rng = as_rng(rng)
+        
         #Final Values
         self.logical_error = None
 
-    def run(self):
+    def run(self, batch_size=None):
         """
         The main routine in this library, follows the recipe `n_trials` times in series:
 
@@ -73,7 +86,12 @@ class Simulation():
         + Infer the error by acting the decoder on the dual lattice, applying the resulting operator to the primary lattice. 
 
         + Record the commutation relations of the resulting operator with the logical operators. 
+
+        If `batch_size` is given, errors and syndromes are instead sampled for `batch_size` trials at a time by a compiled kernel (see :func:`py_qcode._kernels.sample_trials`), and only decoding is done trial-by-trial. This requires a Pauli error model and a code made of noiseless :class:`py_qcode.StabilizerCheck` objects on `lattice`. Random numbers are drawn from `rng`, just as in the serial path.
         """
+        if batch_size is not None:
+            return self._run_batched(batch_size)
+
         self.logical_error = []
         for idx in range(self.n_trials):
             #Clean up results from previous simulation
@@ -81,33 +99,76 @@ class Simulation():
             self.dual_lattice.clear()
 
             #The bulk of the work
-            self.error_model.act_on(self.lattice)
-            self.code.measure()
-            self.decoder.infer()
+            self.error_model.act_on(self.lattice, self.rng)
+            self.code.measure(self.rng)
+            self._decode_and_test()
+    
+        #Clean up results from final simulation
+        self.lattice.clear()
+        self.dual_lattice.clear()
 
-            #Error checking, if the resulting Pauli is not in the 
-            #normalizer, chuck an error:
-            
-            self.dual_lattice.clear()
-            #syndrome_print(self.dual_lattice)
-            self.code.measure()
-            #syndrome_print(self.dual_lattice)
+    def _run_batched(self, batch_size):
+        checks = self.code.parity_check_list
+        if any([check.noise_model[0] > 0. for check in checks]):
+            raise ValueError("Batched sampling requires noiseless "+\
+                "syndrome measurements.")
+        cum_probs = pauli_cum_probs(self.error_model)
+        indptr, indices, reads = stack_checks(checks, self.lattice)
+        
+        #Rows of each check in the stacked syndrome array
+        bounds = [0]
+        for check in checks:
+            bounds.append(bounds[-1] + len(check.support))
+
+        self.lattice.clear()
+        z_init, x_init = self.lattice.pack_errors()
+        
+        self.logical_error = []
+        for start in range(0, self.n_trials, batch_size):
+            n_batch = min(batch_size, self.n_trials - start)
+            z_bits, x_bits, syndromes = sample_trials(indptr, indices,
+                    reads, z_init, x_init, cum_probs, n_batch, self.rng)
             
-            for point in self.dual_lattice.points:
-                if point.syndrome:
-                    raise ValueError('Product of "inferred error"'+\
-                        ' with actual error anticommutes with some'+\
-                        ' stabilizers.')
+            for idx in range(n_batch):
+                self.lattice.clear()
+                self.dual_lattice.clear()
+                
+                self.lattice.unpack_errors(z_bits[idx], x_bits[idx])
+                for check, lo, hi in zip(checks, bounds, bounds[1:]):
+                    check.write_syndromes(syndromes[idx, lo:hi], self.rng)
+                self._decode_and_test()
 
-            com_relation_list = []
-            for operator in self.logical_operators:
-                #print operator
-                com_relation_list.append(operator.test(self.lattice))
-            self.logical_error.append(com_relation_list)
-    
-        #Clean up results from final simulation
         self.lattice.clear()
         self.dual_lattice.clear()
+
+    def _decode_and_test(self):
+        """
+        Decodes the syndromes currently on the dual lattice, checks 
+        that the corrected error is in the normalizer, and records its
+        commutation relations with the logical operators.
+        """
+        self.decoder.infer()
+
+        #Error checking, if the resulting Pauli is not in the 
+        #normalizer, chuck an error:
+        
+        self.dual_lattice.clear()
+        #syndrome_print(self.dual_lattice)
+        self.code.measure(self.rng)
+        #syndrome_print(self.dual_lattice)
+        
+        for point in self.dual_lattice.points:
+            if point.syndrome:
+                raise ValueError('Product of "inferred error"'+\
+                    ' with actual error anticommutes with some'+\
+                    ' stabilizers.')
+
+        com_relation_list = []
+        bits = self.lattice.pack_errors()
+        for operator in self.logical_operators:
+            #print operator
+            com_relation_list.append(operator.test(self.lattice, bits))
+        self.logical_error.append(com_relation_list)
     
     def save(self, filename):
         big_dict = {}
@@ -123,16 +184,16 @@ class Simulation():
         big_dict['n_trials'] = self.n_trials
         big_dict['logical_errors'] = self.logical_error
         
-        with open(filename,'w') as phil:
-            pkl.dump(big_dict, phil)
+        with open(filename,'wb') as phil:
+            pkl.dump(big_dict, phil, pkl.HIGHEST_PROTOCOL)
 
 class FTSimulation():     
     """
-    `FTSimulation` is the class for representing simulations of fault-tolerant error-correction protocols.
+    `FTSimulation` is the class for representing simulations of fault-tolerant error-correction protocols. The `rng` argument is as for :class:`py_qcode.Simulation`.
     """
     #Magic Methods
     def __init__(self, lattice, dual_lattice_list, error_model, synd_noise, code_func, 
-                                decoder, logical_operators, n_trials):
+                                decoder, logical_operators, n_trials, rng=None):
 
         #Defined objects
         self.lattice = lattice
@@ -150,6 +211,9 @@ class FTSimulation():
         #Integer
         self.n_trials = n_trials
         
+        #Created once and passed down to the error model and the code
+        self.rng = as_rng(rng)
+        
         #Final Values
         self.logical_error = None
 
@@ -174,11 +238,11 @@ class FTSimulation():
 
             #The bulk of the work
             for dual_lattice in self.dual_lattice_list[:-1]:
-                self.error_model.act_on(self.lattice)
+                self.error_model.act_on(self.lattice, self.rng)
                 #New code object created for every iteration:
                 current_code = self.code_func(self.lattice, 
                     dual_lattice, self.synd_noise)
-                current_code.measure()
+                current_code.measure(self.rng)
             
             #In order to guarantee that the resulting lattice operator 
             #is in the normalizer, we assume that the final round of 
@@ -187,7 +251,7 @@ class FTSimulation():
             #These errors are cleared.  
             noiseless_code = self.code_func(self.lattice, 
                                     self.dual_lattice_list[-1], 0.0)
-            noiseless_code.measure()
+            noiseless_code.measure(self.rng)
 
             self.decoder.infer()
 
@@ -196,7 +260,7 @@ class FTSimulation():
             
             self.dual_lattice_list[-1].clear()
             #syndrome_print(self.dual_lattice_list[-1])
-            noiseless_code.measure()
+            noiseless_code.measure(self.rng)
             for point in self.dual_lattice_list[-1].points:
                 if point.syndrome:
                     raise ValueError('Product of "inferred error"'+\
@@ -204,9 +268,10 @@ class FTSimulation():
                         ' stabilizers.')
 
             com_relation_list = []
+            bits = self.lattice.pack_errors()
             for operator in self.logical_operators:
                 #print operator
-                com_relation_list.append(operator.test(self.lattice))
+                com_relation_list.append(operator.test(self.lattice, bits))
             self.logical_error.append(com_relation_list)
         
         #Clean up results from final simulation
@@ -229,5 +294,5 @@ class FTSimulation():
         big_dict['n_trials'] = self.n_trials
         big_dict['logical_errors'] = self.logical_error
         
-        with open(filename,'w') as phil:
-            pkl.dump(big_dict, phil)
\ No newline at end of file
+        with open(filename,'wb') as phil:
+            pkl.dump(big_dict, phil, pkl.HIGHEST_PROTOCOL)
\ No newline at end of file
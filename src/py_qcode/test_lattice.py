@@ -1,7 +1,23 @@
 import lattice as lt
 import code as cd
 import utils as ut
-from qecc import I, X, Z
+import error as er
+import _kernels as kn
+import _bitsyn as bs
+import _rng as rg
+import _cache as ch
+from numpy import array, concatenate, uint8
+from numpy.random import rand
+from qecc import I, X, Z, Pauli, commutes_with
+from tempfile import mkdtemp
+from shutil import rmtree
+
+#Keep the supports cached by these tests out of the user's cache:
+g_old_cache_dir, ch.cache_dir = ch.cache_dir, mkdtemp()
+
+def teardown_module():
+    rmtree(ch.cache_dir)
+    ch.cache_dir = g_old_cache_dir
 
 #Global lattices to use in various tests
 g_sq_lat = lt.SquareLattice((8,8))
@@ -178,4 +194,397 @@ def squoct_path_code_test():
         print count
         count += 1
         assert path_com_pred(g_squoct_lat, g_uj_lat, squoct_code, 
-                                        crd_lst, o_crd_lst, pauli)
\ No newline at end of file
+                                        crd_lst, o_crd_lst, pauli)
+
+#Packed-bit syndrome tests:
+#Check that StabilizerCheck.anticommutations agrees with multiplying 
+#out the Paulis on each check and testing commutation directly:
+
+def bit_syndrome_pred(lat, code):
+    er.depolarizing_model(0.3).act_on(lat)
+    for check in code.parity_check_list:
+        bits = check.anticommutations()
+        for idx, row in enumerate(check.support):
+            err = reduce(lambda a, b: a.tens(b), 
+                            [lat.points[pt_idx].error for pt_idx in row])
+            if bits[idx] != 1 - int(commutes_with(check.stabilizer)(err)):
+                lat.clear()
+                return False
+    lat.clear()
+    return True
+
+def toric_bit_syndrome_test():
+    assert bit_syndrome_pred(g_sq_lat, toric_code)
+
+def squoct_bit_syndrome_test():
+    assert bit_syndrome_pred(g_squoct_lat, squoct_code)
+
+def repeated_qubit_test():
+    """
+    On a 1x1 toric code, each check contains some qubits twice, which 
+    cancel out. The compiled and NumPy syndromes agree with qecc.
+    """
+    lat = lt.SquareLattice((1,1))
+    d_lat = lt.SquareLattice((1,1), is_dual=True)
+    code = cd.toric_code(lat, d_lat)
+    for idx in range(len(lat.points)):
+        for pauli in [X, Z]:
+            for pt in lat.points:
+                pt.error = I
+            lat.points[idx].error = pauli
+            z_bits, x_bits = lat.pack_errors()
+            for check in code.parity_check_list:
+                support = check.support
+                numpy_bits = ((z_bits[support] & check._stab_x) ^
+                    (x_bits[support] & check._stab_z)).sum(axis=1) % 2
+                for row, bit in zip(support, numpy_bits):
+                    err = reduce(lambda a, b: a.tens(b), 
+                                [lat.points[pt_idx].error for pt_idx in row])
+                    assert bit == 1 - int(
+                                commutes_with(check.stabilizer)(err))
+                if bs.available:
+                    masks = bs.word_masks(support, check._stab_x, 
+                                            check._stab_z)
+                    assert (bs.syndromes(z_bits, x_bits, masks) == 
+                                numpy_bits).all()
+
+#Cached supports should agree with the point-based neighbourhoods:
+
+def toric_support_test():
+    for name, point_sets in [('star', g_sq_lat.stars()), 
+                                ('plaquette', g_sq_lat.plaquettes())]:
+        support = g_sq_lat.support(name)
+        assert support is g_sq_lat.support(name)
+        for row, point_set in zip(support, point_sets):
+            assert [g_sq_lat.points[idx] for idx in row] == list(point_set)
+
+def squoct_support_test():
+    for name in ['square', 'x_octagon', 'z_octagon']:
+        assert getattr(g_squoct_lat, name + 's')() is \
+                                                g_squoct_lat.support(name)
+        for row, coords in zip(g_squoct_lat.support(name),
+                                g_squoct_lat._support_coords(name)):
+            assert [g_squoct_lat.points[idx].coords for idx in row] == \
+                                                                coords
+
+def toric_rule_path_test():
+    """
+    Checks that StabilizerCheck.rule, used when no primal lattice is 
+    given, produces the same syndromes as the packed-bit path.
+    """
+    er.depolarizing_model(0.3).act_on(g_sq_lat)
+    for check in toric_code.parity_check_list:
+        point_sets = [[g_sq_lat.points[idx] for idx in row] 
+                        for row in check.support]
+        obj_check = cd.StabilizerCheck(point_sets, check.dual_points,
+                                        check.stabilizer, indy_css=True)
+        g_d_sq_lat.clear()
+        obj_check.evaluate()
+        obj_syndromes = [pt.syndrome for pt in check.dual_points]
+        g_d_sq_lat.clear()
+        check.evaluate()
+        assert obj_syndromes == [pt.syndrome for pt in check.dual_points]
+    g_sq_lat.clear()
+    g_d_sq_lat.clear()
+
+def squoct_pauli_path_test():
+    """
+    Checks that the symplectic shortcut used for Pauli errors when no 
+    primal lattice is given agrees with the packed-bit path.
+    """
+    er.depolarizing_model(0.3).act_on(g_squoct_lat)
+    for check in squoct_code.parity_check_list:
+        point_sets = [[g_squoct_lat.points[idx] for idx in row] 
+                        for row in check.support]
+        obj_check = cd.StabilizerCheck(point_sets, check.dual_points,
+                                        check.stabilizer)
+        g_uj_lat.clear()
+        obj_check.evaluate()
+        obj_syndromes = [pt.syndrome for pt in check.dual_points]
+        assert obj_syndromes == check.anticommutations().tolist()
+    g_squoct_lat.clear()
+    g_uj_lat.clear()
+
+#Batched sampling tests:
+#Check that the syndromes returned by the sampling kernel match those
+#obtained by measuring the code after unpacking the sampled errors:
+
+def batched_syndrome_pred(lat, d_lat, code):
+    cum_probs = kn.pauli_cum_probs(er.depolarizing_model(0.3))
+    indptr, indices, reads = kn.stack_checks(code.parity_check_list, lat)
+    lat.clear()
+    z_init, x_init = lat.pack_errors()
+    z_bits, x_bits, syndromes = kn.sample_trials(indptr, indices, reads,
+                                        z_init, x_init, cum_probs, 5)
+    for idx in range(5):
+        lat.unpack_errors(z_bits[idx], x_bits[idx])
+        assert (lat.pack_errors()[0] == z_bits[idx]).all()
+        assert (lat.pack_errors()[1] == x_bits[idx]).all()
+        bits = concatenate([check.anticommutations() 
+                            for check in code.parity_check_list])
+        if not (bits == syndromes[idx]).all():
+            return False
+    lat.clear()
+    return True
+
+def toric_batched_syndrome_test():
+    assert batched_syndrome_pred(g_sq_lat, g_d_sq_lat, toric_code)
+
+def squoct_batched_syndrome_test():
+    assert batched_syndrome_pred(g_squoct_lat, g_uj_lat, squoct_code)
+
+def seeded_batch_test():
+    """
+    Batches sampled from generators with the same seed are the same.
+    """
+    cum_probs = kn.pauli_cum_probs(er.depolarizing_model(0.3))
+    indptr, indices, reads = kn.stack_checks(toric_code.parity_check_list,
+                                                g_sq_lat)
+    z_init, x_init = g_sq_lat.pack_errors()
+    batches = [kn.sample_trials(indptr, indices, reads, z_init, x_init,
+                                cum_probs, 5, rg.default_rng(5))
+                for trial in range(2)]
+    for first, second in zip(*batches):
+        assert (first == second).all()
+
+def pack_words_test():
+    if not bs.available:
+        return
+    bits = (rand(200) < 0.5).astype(uint8)
+    words = bs.pack_words(bits)
+    assert [(int(words[idx // 64]) >> (idx % 64)) & 1 
+                for idx in range(200)] == bits.tolist()
+
+def error_check_join_test():
+    """
+    ErrorCheck rules receive the joined error string of each check, 
+    whether the errors on the lattice are strings or Paulis.
+    """
+    point_sets = g_sq_lat.stars()
+    duals = [g_d_sq_lat[crd] for crd in lt._even_evens(*g_d_sq_lat.size)]
+    check = cd.ErrorCheck(point_sets, duals, lambda err: err)
+    er.depolarizing_model(0.3).act_on(g_sq_lat)
+    
+    check.evaluate()
+    pauli_syndromes = [pt.syndrome for pt in duals]
+    for pt in g_sq_lat.points:
+        pt.error = pt.error.op
+    g_d_sq_lat.clear()
+    check.evaluate()
+    
+    assert pauli_syndromes == [pt.syndrome for pt in duals]
+    assert pauli_syndromes == [''.join([pt.error for pt in pts]) 
+                                for pts in point_sets]
+    g_sq_lat.clear()
+    g_d_sq_lat.clear()
+
+def error_check_sum_test():
+    """
+    Errors which are neither strings nor Paulis are added together 
+    before being passed to the rule.
+    """
+    point_sets = g_sq_lat.stars()
+    duals = [g_d_sq_lat[crd] for crd in lt._even_evens(*g_d_sq_lat.size)]
+    check = cd.ErrorCheck(point_sets, duals, lambda err: err % 2)
+    for idx, pt in enumerate(g_sq_lat.points):
+        pt.error = idx
+    
+    check.evaluate()
+    
+    assert [pt.syndrome for pt in duals] == \
+                [sum([pt.error for pt in pts]) % 2 for pts in point_sets]
+    g_sq_lat.clear()
+    g_d_sq_lat.clear()
+
+def support_function_rule_test():
+    """
+    Function rules on checks given as positions on a primal lattice 
+    are applied to the errors on the points at those positions.
+    """
+    duals = [g_d_sq_lat[crd] for crd in lt._even_evens(*g_d_sq_lat.size)]
+    check = cd.ErrorCheck(g_sq_lat.support('star'), duals, 
+                            lambda err: err, primal_lattice=g_sq_lat)
+    assert check._rule_table is None
+    er.depolarizing_model(0.3).act_on(g_sq_lat)
+    
+    check.evaluate()
+    
+    assert [pt.syndrome for pt in duals] == \
+                [''.join([pt.error.op for pt in pts]) 
+                    for pts in g_sq_lat.stars()]
+    g_sq_lat.clear()
+    g_d_sq_lat.clear()
+
+def syndrome_noise_test():
+    """
+    With syndrome noise of probability 1, every syndrome of the noisy 
+    toric code is flipped relative to the noiseless one.
+    """
+    noisy_code = cd.noisy_toric_code(g_sq_lat, g_d_sq_lat, 1.)
+    er.depolarizing_model(0.3).act_on(g_sq_lat)
+    
+    toric_code.measure()
+    syndromes = [pt.syndrome for pt in g_d_sq_lat.points]
+    g_d_sq_lat.clear()
+    noisy_code.measure()
+    
+    for check in noisy_code.parity_check_list:
+        letter = cd._css_letter(check.stabilizer)
+        for pt in check.dual_points:
+            synd = syndromes[g_d_sq_lat._index(pt.coords)]
+            assert (letter in synd) != (letter in pt.syndrome)
+    g_sq_lat.clear()
+    g_d_sq_lat.clear()
+
+def rule_table_test():
+    """
+    A dict rule gives the same syndromes whether it is looked up by 
+    error string or expanded into a table on the packed errors.
+    """
+    from itertools import product
+    commutator = commutes_with(X & X & X & X)
+    rule = dict([(''.join(ltrs), 
+                    '' if commutator(Pauli(''.join(ltrs))) else 'Z')
+                    for ltrs in product('IXYZ', repeat=4)])
+    point_sets = g_sq_lat.stars()
+    duals = [g_d_sq_lat[crd] for crd in lt._even_evens(*g_d_sq_lat.size)]
+    str_check = cd.ErrorCheck(point_sets, duals, rule)
+    table_check = cd.ErrorCheck(g_sq_lat.support('star'), duals, rule,
+                                    primal_lattice=g_sq_lat)
+    assert table_check._rule_table is not None
+    er.depolarizing_model(0.3).act_on(g_sq_lat)
+
+    str_check.evaluate()
+    str_syndromes = [pt.syndrome for pt in duals]
+    g_d_sq_lat.clear()
+    table_check.evaluate()
+    
+    assert str_syndromes == [pt.syndrome for pt in duals]
+    g_sq_lat.clear()
+    g_d_sq_lat.clear()
+
+def cache_test():
+    """
+    Arrays are built once, and then loaded from the cache directory.
+    """
+    from numpy import arange
+    builds = []
+    def builder():
+        builds.append(1)
+        return arange(12).reshape(3, 4)
+    first = ch.get_or_build(('test', (3, 4)), builder)
+    del ch._loaded[('test', (3, 4))]
+    second = ch.get_or_build(('test', (3, 4)), builder)
+    assert len(builds) == 1
+    assert (first == second).all()
+    assert ch.get_or_build(('test', (3, 4)), builder) is second
+
+def logical_com_pred(lat, log_ops):
+    """
+    Predicate which tests that logical operators find the same 
+    commutation relations with random errors as qecc.com.
+    """
+    from qecc import com
+    for trial in range(10):
+        er.depolarizing_model(0.2).act_on(lat)
+        for op in log_ops:
+            test_pauli = reduce(lambda a, b: a.tens(b), 
+                            [lat[coord].error for coord in op.coord_list])
+            if op.test(lat) != (op.name, com(test_pauli, op.pauli)):
+                return False
+        lat.clear()
+    return True
+
+def toric_logical_test():
+    assert logical_com_pred(g_sq_lat, ut.toric_log_ops(g_sq_lat.size))
+
+def squoct_logical_test():
+    assert logical_com_pred(g_squoct_lat, 
+                                ut.squoct_log_ops(g_squoct_lat.total_size))
+
+def seeded_rng_test():
+    """
+    Errors and syndrome noise drawn from generators with the same seed
+    are the same.
+    """
+    noisy_code = cd.noisy_toric_code(g_sq_lat, g_d_sq_lat, 0.2)
+    results = []
+    for trial in range(2):
+        rng = rg.default_rng(5)
+        er.depolarizing_model(0.3).act_on(g_sq_lat, rng)
+        noisy_code.measure(rng)
+        results.append(([pt.error.op for pt in g_sq_lat.points],
+                        [pt.syndrome for pt in g_d_sq_lat.points]))
+        g_sq_lat.clear()
+        g_d_sq_lat.clear()
+    assert results[0] == results[1]
+
+def index_test():
+    """
+    Closed-form and vectorized indexing find every point on each of the
+    global lattices in its own position.
+    """
+    for lat in [g_sq_lat, g_d_sq_lat, g_squoct_lat, g_uj_lat]:
+        coords = array([pt.coords for pt in lat.points])
+        assert map(lat._index, map(crds, lat.points)) == range(len(coords))
+        assert lat._index_array(coords).tolist() == range(len(coords))
+        assert lat[coords] == lat.points
+
+def code_impl_test():
+    """
+    Toric codes on different lattices of the same size share their 
+    supports, but are bound to their own lattices.
+    """
+    lat = lt.SquareLattice((8,8))
+    d_lat = lt.SquareLattice((8,8), is_dual=True)
+    other_code = cd.toric_code(lat, d_lat)
+    for check, other in zip(toric_code.parity_check_list,
+                            other_code.parity_check_list):
+        assert other.support is check.support
+        assert other.primal_lattice is lat
+        assert all([pt is d_lat[pt.coords] for pt in other.dual_points])
+
+def non_string_rule_test():
+    """
+    Dict rules whose keys aren't strings are looked up directly, with 
+    or without a primal lattice.
+    """
+    point_sets = g_sq_lat.stars()
+    duals = [g_d_sq_lat[crd] for crd in lt._even_evens(*g_d_sq_lat.size)]
+    for pt in g_sq_lat.points:
+        pt.error = 1
+    rule = {4: 'a', (1, 1, 1, 1): 'b'}
+    for check in [cd.ErrorCheck(point_sets, duals, rule),
+                    cd.ErrorCheck(g_sq_lat.support('star'), duals, rule,
+                                    primal_lattice=g_sq_lat)]:
+        assert check._rule_table is None
+        check.evaluate()
+        assert all([pt.syndrome == 'a' for pt in duals])
+        g_d_sq_lat.clear()
+    g_sq_lat.clear()
+
+def incomplete_rule_test():
+    """
+    Dict rules which miss some errors are still evaluated on the other 
+    errors, and raise a KeyError naming the first missing one.
+    """
+    rule = {'IIII': '', 'XIII': 'Z'}
+    point_sets = g_sq_lat.stars()
+    duals = [g_d_sq_lat[crd] for crd in lt._even_evens(*g_d_sq_lat.size)]
+    for check in [cd.ErrorCheck(point_sets, duals, rule),
+                    cd.ErrorCheck(g_sq_lat.support('star'), duals, rule,
+                                    primal_lattice=g_sq_lat)]:
+        assert not check._rule_complete
+        for pt in g_sq_lat.points:
+            pt.error = I
+        check.evaluate()
+        assert all([pt.syndrome == '' for pt in duals])
+        
+        point_sets[0][1].error = Z
+        try:
+            check.evaluate()
+            raise AssertionError("Missing error was not reported.")
+        except KeyError as err:
+            assert 'IZII' in err.args[0]
+        g_sq_lat.clear()
+        g_d_sq_lat.clear()
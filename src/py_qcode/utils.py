@@ -1,4 +1,7 @@
-import cPickle as pkl
+try:
+    import cPickle as pkl
+except ImportError:
+    import pickle as pkl
 
 from simulation import Simulation, FTSimulation
 from lattice import SquareLattice, SquareOctagonLattice, UnionJackLattice
@@ -6,8 +9,7 @@ from error import depolarizing_model
 from decoder import mwpm_decoder, ft_mwpm_decoder
 from code import toric_code, noisy_toric_code, square_octagon_code, noisy_squoct_code
 from logical_operators import toric_log_ops, squoct_log_ops
-
-import cPickle as pkl
+from numpy import flatnonzero
 
 __all__ = ['sim_from_file', 'square_toric_code_sim', 'error_print',
             'syndrome_print', 'squoct_sim', 'noisy_toric_code_sim',
@@ -26,10 +28,11 @@ def n_anyons(dual_lattice, anyon_t):
 
 def error_print(lattice):
     printnone = True
-    for point in lattice.points:
-        if (point.error) and (not(point.error.op == 'I')):
-            print point
-            printnone = False
+    #Only visit the points with errors, found from the packed bits:
+    z_bits, x_bits = lattice.pack_errors()
+    for idx in flatnonzero(z_bits | x_bits).tolist():
+        print lattice.points[idx]
+        printnone = False
 
     if printnone:
         print "No Errors"
@@ -61,7 +64,7 @@ def sim_from_file(filename):
     """
     #Obsolete, scavenging code for pickle-independent implementation
     #(you can't pickle functions).
-    with open(filename,'r') as phil:
+    with open(filename,'rb') as phil:
         sim_dict = pkl.load(phil)
     sim = Simulation(**sim_dict)
     sim.run()
@@ -77,13 +80,15 @@ def sim_from_file(filename):
 
     sim.save(output_name)
 
-def square_toric_code_sim(size, error_rate, n_trials, filename):
+def square_toric_code_sim(size, error_rate, n_trials, filename,
+                            batch_size=None):
     """
     This function is square in more than one sense; it does everything
     the most vanilla way possible, and it uses a square grid to define 
     the torus. You put in an integer size, an error rate and a number
     of trials to execute, and it produces a pickled dict containing 
-    the input to a simulation object in a file.
+    the input to a simulation object in a file. `batch_size` is passed
+    to :meth:`py_qcode.Simulation.run`.
     """
     
     sim_lattice = SquareLattice((size,size))
@@ -102,7 +107,7 @@ def square_toric_code_sim(size, error_rate, n_trials, filename):
     sim_dict = dict(zip(sim_keys, sim_values))
 
     sim = Simulation(**sim_dict)
-    sim.run()
+    sim.run(batch_size)
     sim.save(filename + '.sim')
 
 def noisy_toric_code_sim(size, error_rate, n_trials, filename):
@@ -137,7 +142,7 @@ def noisy_toric_code_sim(size, error_rate, n_trials, filename):
     sim.save(filename + '.sim')
 
 
-def squoct_sim(size, error_rate, n_trials, filename):
+def squoct_sim(size, error_rate, n_trials, filename, batch_size=None):
     """
     Copypasta from square_toric_code_sim, maybe I'll un-pasta this 
     later. 
@@ -159,7 +164,7 @@ def squoct_sim(size, error_rate, n_trials, filename):
     sim_dict = dict(zip(sim_keys, sim_values))
 
     sim = Simulation(**sim_dict)
-    sim.run()
+    sim.run(batch_size)
     sim.save(filename + '.sim')
 
 def noisy_squoct_sim(size, error_rate, n_trials, filename):